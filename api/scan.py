@@ -1,13 +1,12 @@
 from http.server import BaseHTTPRequestHandler
+try:
+    import orjson
+except ImportError:  # Fall back to the stdlib encoder when orjson isn't installed
+    orjson = None
 import json
 
 class handler(BaseHTTPRequestHandler):
     def do_POST(self):
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
         response = {
             'success': False,
             'error': 'Python backend cannot be deployed on Vercel due to size limits. Please run locally:',
@@ -26,7 +25,14 @@ class handler(BaseHTTPRequestHandler):
             }
         }
         
-        self.wfile.write(json.dumps(response).encode())
+        body = orjson.dumps(response) if orjson is not None else json.dumps(response).encode()
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
         
     def do_OPTIONS(self):
         self.send_response(200)
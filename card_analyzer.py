@@ -2,37 +2,144 @@
 Card Analyzer Module - Uses Google Gemini to extract and analyze card information
 """
 import os
+import asyncio
 import base64
-from typing import Dict, Any, Optional
-import cv2
+import copy
+import functools
+import random
+import re
+import shelve
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
 import numpy as np
 from PIL import Image
-import PIL.PngImagePlugin  # Ensure PNG plugin is loaded
 import io
 import json
-import google.generativeai as genai
+try:
+    import orjson
+except ImportError:  # Fall back to the stdlib parser when orjson isn't installed
+    orjson = None
 from datetime import datetime
 
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can keep catching the latter
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+# Markdown code fence opening a line (optionally after prose) around a JSON reply.
+# It closes at a fence starting a line or ending the reply, or may be cut off,
+# so a fence inside a JSON string value doesn't end the block
+_FENCE_RE = re.compile(r'^```(?:json)?\s*(.*?)\s*(?:^```|```\s*\Z|\Z)',
+                       re.DOTALL | re.MULTILINE | re.IGNORECASE)
+
+
+def _strip_code_fence(content: str) -> str:
+    """Return the body of the first markdown code block in content, or content itself"""
+    content = content.strip()
+    # Bare JSON is returned as is, even if a string value inside it contains a fence
+    if content.startswith(('{', '[')):
+        return content
+    match = _FENCE_RE.search(content)
+    return match.group(1) if match else content
+
+
+# Maximum number of images sent in a single Gemini request
+MAX_BATCH_SIZE = 16
+
+# Upload size limits - card text stays legible well below scanner resolution
+MAX_DIM = 1024
+JPEG_QUALITY = 85
+
+# Number of analyses kept in the perceptual-hash cache
+CACHE_SIZE = 1024
+
+# Hash matches within this Hamming distance are trusted without calling Gemini
+HASH_MATCH_DISTANCE = 4
+
+# Retry policy for rate-limited / transient Gemini failures
+MAX_RETRIES = 5
+
+# cv2, imagehash (scipy) and google.generativeai are imported where they are used,
+# so importing this module stays cheap for code paths that never touch them
+
+
+@functools.lru_cache(maxsize=None)
+def _retryable_errors() -> tuple:
+    """Gemini exceptions worth retrying: rate limits and transient server errors"""
+    from google.api_core import exceptions as google_exceptions
+    return (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+    )
+
+
+# genai.configure is process-global and models resolve their client lazily at the
+# first request, so only one API key is supported per process
+_configured_key = None
+_configure_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=8)
+def _get_model(api_key: str, model_name: str):
+    """
+    Shared GenerativeModel per model_name, so analyzers created per request reuse
+    one client and its connections. Callers must not mutate it.
+    
+    Raises:
+        ValueError: If a different API key was already configured in this process
+    """
+    global _configured_key
+    import google.generativeai as genai
+    
+    with _configure_lock:
+        if _configured_key is None:
+            genai.configure(api_key=api_key)
+            _configured_key = api_key
+        elif api_key != _configured_key:
+            # Configuring a second key would silently switch every model to it
+            raise ValueError("Only one Gemini API key is supported per process")
+    return genai.GenerativeModel(model_name)
+
+
 class CardAnalyzer:
     """Uses Google Gemini to analyze card images"""
     
-    def __init__(self, api_key: str = None, model_name: str = "gemini-2.0-flash-exp"):
+    def __init__(self, api_key: str = None, model_name: str = "gemini-2.0-flash-exp",
+                 max_dim: int = MAX_DIM, jpeg_quality: int = JPEG_QUALITY,
+                 cache_path: str = None):
         """
         Initialize the card analyzer with Gemini
         
         Args:
             api_key: API key for Google AI
             model_name: Gemini model to use (e.g., gemini-2.0-flash-exp, gemini-1.5-pro, etc.)
+            max_dim: Longest image edge (px) sent to Gemini; larger images are downscaled
+            jpeg_quality: JPEG quality used when encoding images for upload
+            cache_path: Optional shelve file so cached analyses survive restarts
         """
         self.api_key = api_key or os.environ.get('GOOGLE_API_KEY')
         self.model_name = model_name
+        self.max_dim = max_dim
+        self.jpeg_quality = jpeg_quality
+        self.concurrency = int(os.environ.get('GEMINI_CONCURRENCY', 8))
+        
+        # LRU cache of perceptual hash -> card data, so rescans skip the API call
+        self._cache: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_store = shelve.open(cache_path) if cache_path else None
+        if self._cache_store is not None:
+            self._cache.update(self._cache_store)
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        self.cache_hits = 0
+        self.cache_misses = 0
         
         if not self.api_key:
             raise ValueError("API key required. Set GOOGLE_API_KEY environment variable or pass api_key parameter")
         
         # Configure Gemini
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel(self.model_name)
+        self.model = _get_model(self.api_key, self.model_name)
     
     def numpy_to_pil(self, image: np.ndarray) -> Image.Image:
         """Convert numpy array image to PIL Image"""
@@ -43,36 +150,182 @@ class CardAnalyzer:
         if len(image.shape) < 2:
             raise ValueError("Invalid image dimensions")
         
-        # Handle different image formats
-        if len(image.shape) == 3:
-            if image.shape[2] == 3:
-                # BGR to RGB conversion
-                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            elif image.shape[2] == 4:
-                # BGRA to RGBA conversion
-                image = cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA)
-            elif image.shape[2] > 4:
-                raise ValueError(f"Unsupported number of channels: {image.shape[2]}")
+        if len(image.shape) == 3 and image.shape[2] > 4:
+            raise ValueError(f"Unsupported number of channels: {image.shape[2]}")
         
         # Ensure valid data type and range
         if image.dtype != np.uint8:
             image = np.clip(image, 0, 255).astype(np.uint8)
         
+        # Downscale so the longest edge fits within max_dim
+        height, width = image.shape[:2]
+        if max(height, width) > self.max_dim:
+            import cv2
+            scale = self.max_dim / max(height, width)
+            image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+            height, width = image.shape[:2]
+        
+        # BGR(A) to RGB(A): let PIL swap channels while unpacking the buffer,
+        # so the pixels are copied once instead of via an intermediate array
+        if len(image.shape) == 3 and image.shape[2] in (3, 4):
+            mode, rawmode = ('RGB', 'BGR') if image.shape[2] == 3 else ('RGBA', 'BGRA')
+            return Image.frombytes(mode, (width, height), np.ascontiguousarray(image), 'raw', rawmode)
+        
         return Image.fromarray(image)
     
-    def analyze_card(self, image: np.ndarray, additional_context: Dict[str, Any] = None) -> Dict[str, Any]:
+    def _encode_for_gemini(self, pil_image: Image.Image) -> Dict[str, Any]:
+        """Encode a PIL Image as a JPEG blob that Gemini accepts directly"""
+        if pil_image.mode not in ('RGB', 'L'):
+            pil_image = pil_image.convert('RGB')
+        
+        buf = io.BytesIO()
+        pil_image.save(buf, format="JPEG", quality=self.jpeg_quality, optimize=True)
+        return {"mime_type": "image/jpeg", "data": buf.getvalue()}
+    
+    def _generate_content(self, parts: List[Any]):
+        """Call Gemini, retrying with exponential backoff on rate limits and transient errors"""
+        for attempt in range(MAX_RETRIES):
+            try:
+                return self.model.generate_content(parts)
+            except _retryable_errors() as e:
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                delay = 2 ** attempt + random.random()
+                print(f"Gemini request failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+    
+    def _image_hash(self, pil_image: Image.Image) -> str:
+        """Perceptual hash used as the analysis cache key"""
+        import imagehash
+        return str(imagehash.phash(pil_image, hash_size=16))
+    
+    def _cache_get(self, key: str, timestamp: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of a cached analysis with a fresh timestamp, or None"""
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is None:
+                self.cache_misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+        
+        card_data = copy.deepcopy(cached)
+        card_data['analysis_timestamp'] = timestamp
+        card_data['from_cache'] = True
+        return card_data
+    
+    def _cache_put(self, key: str, card_data: Dict[str, Any]) -> None:
+        """Store a successful analysis, evicting the least recently used entry when full"""
+        if 'error' in card_data or 'raw_analysis' in card_data:
+            return
+        
+        card_data = copy.deepcopy(card_data)
+        with self._cache_lock:
+            self._cache[key] = card_data
+            self._cache.move_to_end(key)
+            if self._cache_store is not None:
+                self._cache_store[key] = card_data
+            while len(self._cache) > CACHE_SIZE:
+                evicted, _ = self._cache.popitem(last=False)
+                if self._cache_store is not None:
+                    del self._cache_store[evicted]
+    
+    def analyze_card(self, image: np.ndarray, additional_context: Dict[str, Any] = None,
+                     detailed: bool = False, timestamp: str = None) -> Dict[str, Any]:
         """
         Analyze a card image using Gemini's vision capabilities
         
         Args:
             image: Card image as numpy array
-            additional_context: Any additional context (e.g., from hash matching)
+            additional_context: Any additional context (e.g., from hash matching), with
+                optional 'cardname', 'set', 'number', 'rarity', 'hash_distance' and 'confidence'
+            detailed: Always call Gemini, even when a close hash match already identifies the card
+            timestamp: ISO timestamp to record as analysis_timestamp; defaults to now
             
         Returns:
             Dictionary with extracted card information
         """
-        # Convert numpy array to PIL Image
-        pil_image = self.numpy_to_pil(image)
+        # A missing or None hash_distance means there was no hash match
+        if (not detailed and additional_context
+                and additional_context.get('hash_distance') is not None
+                and additional_context['hash_distance'] <= HASH_MATCH_DISTANCE):
+            return self._card_from_hash_match(additional_context, timestamp or datetime.now().isoformat())
+        
+        return self.analyze_cards([image], additional_context, timestamp)[0]
+    
+    def _card_from_hash_match(self, additional_context: Dict[str, Any], timestamp: str) -> Dict[str, Any]:
+        """Build card data from a trusted hash match, skipping the vision API"""
+        return {
+            'name': additional_context.get('cardname'),
+            'set': additional_context.get('set'),
+            'number': additional_context.get('number'),
+            'rarity': additional_context.get('rarity'),
+            'confidence': additional_context.get('confidence'),
+            'hash_distance': additional_context['hash_distance'],
+            'source': 'hash_match',
+            'analysis_timestamp': timestamp
+        }
+    
+    def analyze_cards(self, images: List[np.ndarray], additional_context: Dict[str, Any] = None,
+                      timestamp: str = None) -> List[Dict[str, Any]]:
+        """
+        Analyze several card images, sending up to MAX_BATCH_SIZE per Gemini call
+        
+        Args:
+            images: Card images as numpy arrays
+            additional_context: Any additional context (e.g., from hash matching)
+            timestamp: ISO timestamp to record as analysis_timestamp; defaults to now
+            
+        Returns:
+            List of dictionaries with extracted card information, in input order
+        """
+        timestamp = timestamp or datetime.now().isoformat()
+        pil_images = [self.numpy_to_pil(image) for image in images]
+        hashes = [self._image_hash(pil_image) for pil_image in pil_images]
+        results = [self._cache_get(h, timestamp) for h in hashes]
+        
+        # Only cache misses are sent to Gemini
+        misses = [i for i, result in enumerate(results) if result is None]
+        for start in range(0, len(misses), MAX_BATCH_SIZE):
+            batch = misses[start:start + MAX_BATCH_SIZE]
+            analyses = self._analyze_batch([pil_images[i] for i in batch], additional_context, timestamp)
+            for i, card_data in zip(batch, analyses):
+                results[i] = card_data
+                self._cache_put(hashes[i], card_data)
+        
+        return results
+    
+    async def analyze_card_async(self, image: np.ndarray, additional_context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Async variant of analyze_card; the blocking Gemini call runs in a worker thread
+        """
+        return await asyncio.to_thread(self.analyze_card, image, additional_context)
+    
+    async def analyze_many(self, images: List[np.ndarray], concurrency: int = None) -> List[Dict[str, Any]]:
+        """
+        Analyze many card images concurrently, one Gemini request per image
+        
+        Args:
+            images: Card images as numpy arrays
+            concurrency: Maximum in-flight requests (defaults to GEMINI_CONCURRENCY, or 8)
+            
+        Returns:
+            List of dictionaries with extracted card information, in input order
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+        
+        async def analyze(image: np.ndarray) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.analyze_card_async(image)
+        
+        return await asyncio.gather(*(analyze(image) for image in images))
+    
+    def _analyze_batch(self, pil_images: List[Image.Image], additional_context: Dict[str, Any],
+                       timestamp: str) -> List[Dict[str, Any]]:
+        """Analyze one batch of card images with a single Gemini request"""
+        # Encode as JPEG blobs for upload
+        image_parts = [self._encode_for_gemini(pil_image) for pil_image in pil_images]
         
         # Build context from hash matching if available
         context = ""
@@ -80,7 +333,7 @@ class CardAnalyzer:
             if 'cardname' in additional_context:
                 context = f"This appears to be {additional_context['cardname']} based on image matching. "
         
-        prompt = f"""Analyze this Pokemon card image and extract the following information:
+        prompt = f"""Analyze these {len(image_parts)} Pokemon card image(s) and extract the following information for each card:
         
         {context}
         
@@ -100,53 +353,57 @@ class CardAnalyzer:
         7. Any special features (First Edition, Shadowless, etc.)
         8. Card condition observations (if visible)
         
-        Return the information as a valid JSON object only, with no additional text or markdown.
+        Return a valid JSON array only, with no additional text or markdown.
+        The array must contain exactly one JSON object per image, in the same order as the images.
         """
         
         try:
             # Generate content with Gemini
-            print(f"Calling Gemini API with model: {self.model_name}")
-            response = self.model.generate_content([prompt, pil_image])
+            print(f"Calling Gemini API with model: {self.model_name} ({len(image_parts)} image(s))")
+            response = self._generate_content([prompt] + image_parts)
             
             # Extract the text response
             content = response.text.strip()
             print(f"Gemini response received, length: {len(content)} chars")
             
             # Clean up the response if it has markdown code blocks
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
+            content = _strip_code_fence(content)
             
             # Try to parse as JSON
             try:
-                card_data = json.loads(content)
-            except json.JSONDecodeError as e:
+                parsed = _json_loads(content)
+                # A single card may come back as a bare object
+                if isinstance(parsed, dict):
+                    parsed = [parsed]
+                if not isinstance(parsed, list) or len(parsed) != len(image_parts):
+                    raise ValueError(f"Expected {len(image_parts)} card objects in response")
+                cards = [card if isinstance(card, dict) else {"raw_analysis": card} for card in parsed]
+            except (json.JSONDecodeError, ValueError) as e:
                 print(f"Failed to parse JSON: {e}")
                 print(f"Raw response: {content[:500]}")  # Show first 500 chars
                 # If not valid JSON, create structured data from text
-                card_data = {"raw_analysis": content}
+                cards = [{"raw_analysis": content} for _ in image_parts]
             
-            card_data['analysis_timestamp'] = datetime.now().isoformat()
-            card_data['model_used'] = self.model_name
+            for card_data in cards:
+                card_data['analysis_timestamp'] = timestamp
+                card_data['model_used'] = self.model_name
             
-            return card_data
+            return cards
             
         except Exception as e:
             print(f"Error calling Gemini API: {e}")
-            return {
-                "error": str(e),
-                "analysis_timestamp": datetime.now().isoformat()
-            }
+            return [
+                {
+                    "error": str(e),
+                    "analysis_timestamp": timestamp
+                } for _ in image_parts
+            ]
     
     def extract_card_details(self, image: np.ndarray) -> Dict[str, Any]:
         """
         Extract structured card details with a more focused prompt
         """
-        pil_image = self.numpy_to_pil(image)
+        image_part = self._encode_for_gemini(self.numpy_to_pil(image))
         
         prompt = """Extract the following details from this Pokemon card in JSON format:
         {
@@ -166,17 +423,18 @@ class CardAnalyzer:
         """
         
         try:
-            response = self.model.generate_content([prompt, pil_image])
+            response = self._generate_content([prompt, image_part])
             content = response.text.strip()
             
             # Clean JSON response
-            if "```" in content:
-                content = content.split("```")[1]
-                if content.startswith("json"):
-                    content = content[4:]
-            
-            return json.loads(content.strip())
+            return _json_loads(_strip_code_fence(content))
             
         except Exception as e:
             print(f"Error extracting card details: {e}")
-            return {"error": str(e)}
\ No newline at end of file
+            return {"error": str(e)}
+    
+    async def extract_card_details_async(self, image: np.ndarray) -> Dict[str, Any]:
+        """
+        Async variant of extract_card_details; the blocking Gemini call runs in a worker thread
+        """
+        return await asyncio.to_thread(self.extract_card_details, image)
\ No newline at end of file
@@ -1,46 +1,184 @@
 """
 Price Scraper Module - Fetches card prices from various marketplaces
 """
+import numpy as np
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.util.request import ACCEPT_ENCODING
 import json
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime
+import bisect
+import functools
+import itertools
 import time
+import random
 import re
-from urllib.parse import quote_plus
-from fake_useragent import UserAgent
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus, urlparse
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # Fall back to BeautifulSoup when selectolax isn't installed
+    LexborHTMLParser = None
+    from bs4 import BeautifulSoup
+
+# Matches patterns like $12.99, €15.50, USD 25.00, etc.
+_PRICE_RE = re.compile(r'[\$€£]?\s*(\d+(?:,\d{3})*(?:\.\d{2})?)')
+_CLEAN_RE = re.compile(r'[^\d.,]')
+
+# Listing titles for promotional or non-card items
+_SKIP_RE = re.compile(r'promotion|lot of|bulk|random', re.IGNORECASE)
+
+# Bot-check pages, matched on the raw response body
+_CAPTCHA_RE = re.compile(rb'captcha', re.IGNORECASE)
+
+# Keyword tiers for fallback price estimates (substring matches on lowercased names)
+_EXPENSIVE_CARDS_RE = re.compile(r'charizard|pikachu|mewtwo|mew')
+_MID_TIER_CARDS_RE = re.compile(r'blastoise|venusaur|alakazam')
+_PREMIUM_SETS_RE = re.compile(r'base|shadowless|first edition')
+_DISCOUNT_SETS_RE = re.compile(r'unlimited|evolutions')
+
+# Realistic desktop/mobile browser UAs, rotated per request without any I/O
+_USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36 Edg/122.0.0.0',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:123.0) Gecko/20100101 Firefox/123.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.3 Safari/605.1.15',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:122.0) Gecko/20100101 Firefox/122.0',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64; rv:122.0) Gecko/20100101 Firefox/122.0',
+    'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_3 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.3 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (iPad; CPU OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (Linux; Android 13; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36',
+)
+
+# Per-request header mappings, built once; requests merges them without mutating
+_UA_HEADERS = tuple({'User-Agent': user_agent} for user_agent in _USER_AGENTS)
+
+# Minimum delay between requests to the same host, to be respectful
+REQUEST_DELAY = 1.0  # seconds
+
+# Maximum concurrent in-flight requests to the same host
+MAX_REQUESTS_PER_HOST = 4
+
+
+def _parse_html(response: requests.Response):
+    """Parse a response body with selectolax (lexbor), or BeautifulSoup/lxml as a fallback"""
+    if LexborHTMLParser is not None:
+        return LexborHTMLParser(response.content)
+    return BeautifulSoup(response.text, 'lxml')
+
+
+def _select(node, selector: str) -> list:
+    """All descendants of node matching a CSS selector"""
+    return node.css(selector) if LexborHTMLParser is not None else node.select(selector)
+
+
+def _select_one(node, selector: str):
+    """First descendant of node matching a CSS selector, or None"""
+    return node.css_first(selector) if LexborHTMLParser is not None else node.select_one(selector)
+
+
+def _text(node) -> str:
+    """Whitespace-stripped text content of node, or '' when node is None"""
+    if node is None:
+        return ''
+    return node.text(strip=True) if LexborHTMLParser is not None else node.get_text(strip=True)
+
+
+def _attr(node, name: str) -> Optional[str]:
+    """Attribute value of node, or None"""
+    return node.attributes.get(name) if LexborHTMLParser is not None else node.get(name)
+
 
 class CardPriceScraper:
     """Scrapes card prices from TCGPlayer, eBay, and other sources"""
     
+    _BASE_HEADERS = {
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        # urllib3 adds 'br' when a Brotli decoder is installed
+        'Accept-Encoding': ACCEPT_ENCODING,
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1'
+    }
+    
     def __init__(self):
         """Initialize the price scraper with rotating user agents"""
-        self.ua = UserAgent()
         self.session = requests.Session()
         
+        # Pool keep-alive connections per host and retry transient failures;
+        # one pooled socket per in-flight slot so every connection gets reused
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=MAX_REQUESTS_PER_HOST, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # Static headers are set once; only the User-Agent rotates per request
+        self.session.headers.update(self._BASE_HEADERS)
+        
+        # Per-host throttling so concurrent scrapes stay polite
+        self._host_locks = {}
+        self._host_slots = {}
+        self._host_locks_guard = threading.Lock()
+        self._last_request = {}
+        
+    def _host_state(self, host: str) -> Tuple[threading.Lock, threading.Semaphore]:
+        """Throttle lock and in-flight request semaphore for a host"""
+        with self._host_locks_guard:
+            if host not in self._host_locks:
+                self._host_locks[host] = threading.Lock()
+                self._host_slots[host] = threading.BoundedSemaphore(MAX_REQUESTS_PER_HOST)
+            return self._host_locks[host], self._host_slots[host]
+    
+    def _throttle(self, host: str) -> None:
+        """Block until at least REQUEST_DELAY has passed since the last request to this host"""
+        lock, _ = self._host_state(host)
+        with lock:
+            wait = self._last_request.get(host, 0.0) + REQUEST_DELAY - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request[host] = time.monotonic()
+    
+    def _fetch(self, url: str) -> requests.Response:
+        """GET a page with randomized headers, respecting per-host throttling"""
+        host = urlparse(url).netloc
+        _, slots = self._host_state(host)
+        with slots:
+            self._throttle(host)
+            response = self.session.get(url, headers=self._get_headers(), timeout=10)
+        response.raise_for_status()
+        return response
+        
     def _get_headers(self) -> Dict[str, str]:
-        """Get randomized headers for requests"""
-        return {
-            'User-Agent': self.ua.random,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        }
+        """Get randomized per-request headers; the rest of _BASE_HEADERS lives on the session"""
+        return random.choice(_UA_HEADERS)
     
-    def scrape_tcgplayer(self, card_name: str, set_name: str = None) -> Dict[str, Any]:
+    def scrape_tcgplayer(self, card_name: str, set_name: str = None, timestamp: str = None) -> Dict[str, Any]:
         """
         Scrape prices from TCGPlayer
         
         Args:
             card_name: Name of the card
             set_name: Optional set name for more accurate results
+            timestamp: ISO timestamp to record; defaults to now
             
         Returns:
             Dictionary with pricing information
         """
+        timestamp = timestamp or datetime.now().isoformat()
         search_query = f"{card_name} {set_name}" if set_name else card_name
         encoded_query = quote_plus(search_query)
         
@@ -48,39 +186,48 @@ class CardPriceScraper:
         url = f"https://www.tcgplayer.com/search/pokemon/product?productLineName=pokemon&q={encoded_query}"
         
         try:
-            response = self.session.get(url, headers=self._get_headers(), timeout=10)
-            response.raise_for_status()
+            response = self._fetch(url)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            tree = _parse_html(response)
             
             prices = {
                 'source': 'TCGPlayer',
                 'search_query': search_query,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': timestamp,
                 'url': url,
                 'results': []
             }
             
             # Parse search results (TCGPlayer structure may vary)
             # This is a simplified example - actual implementation would need to handle dynamic content
-            product_items = soup.find_all('div', class_='search-result')
+            product_items = _select(tree, 'div.search-result')
+            price_texts = []
             
-            for item in product_items[:5]:  # Top 5 results
+            for item in product_items:
+                if len(prices['results']) >= 5:  # Top 5 results
+                    break
                 try:
-                    name = item.find('span', class_='product-name')
-                    price = item.find('span', class_='product-price')
-                    condition = item.find('span', class_='condition')
+                    name = _select_one(item, 'span.product-name')
+                    price = _select_one(item, 'span.product-price')
+                    condition = _select_one(item, 'span.condition')
+                    link = _select_one(item, 'a')
                     
                     if name and price:
-                        prices['results'].append({
-                            'name': name.text.strip(),
-                            'price': self._parse_price(price.text.strip()),
-                            'condition': condition.text.strip() if condition else 'Unknown',
-                            'link': item.find('a')['href'] if item.find('a') else None
-                        })
+                        result = {
+                            'name': _text(name),
+                            'price': None,  # Filled in below by _parse_prices_bulk
+                            'condition': _text(condition) or 'Unknown',
+                            'link': _attr(link, 'href') if link else None
+                        }
+                        # Append both only once the row is complete so they stay index-aligned
+                        price_texts.append(_text(price))
+                        prices['results'].append(result)
                 except Exception as e:
                     continue
             
+            for result, price in zip(prices['results'], self._parse_prices_bulk(price_texts)):
+                result['price'] = price
+            
             # If no results from parsing, try API approach
             if not prices['results']:
                 prices['note'] = "Direct scraping failed, consider using TCGPlayer API for production"
@@ -91,20 +238,22 @@ class CardPriceScraper:
             return {
                 'source': 'TCGPlayer',
                 'error': str(e),
-                'timestamp': datetime.now().isoformat()
+                'timestamp': timestamp
             }
     
-    def scrape_ebay(self, card_name: str, set_name: str = None) -> Dict[str, Any]:
+    def scrape_ebay(self, card_name: str, set_name: str = None, timestamp: str = None) -> Dict[str, Any]:
         """
         Scrape prices from eBay sold listings
         
         Args:
             card_name: Name of the card
             set_name: Optional set name for more accurate results
+            timestamp: ISO timestamp to record; defaults to now
             
         Returns:
             Dictionary with pricing information
         """
+        timestamp = timestamp or datetime.now().isoformat()
         search_query = f"{card_name} {set_name} pokemon card" if set_name else f"{card_name} pokemon card"
         encoded_query = quote_plus(search_query)
         
@@ -112,94 +261,106 @@ class CardPriceScraper:
         url = f"https://www.ebay.com/sch/i.html?_nkw={encoded_query}&_sacat=0&LH_Sold=1&LH_Complete=1"
         
         try:
-            response = self.session.get(url, headers=self._get_headers(), timeout=10)
-            response.raise_for_status()
+            response = self._fetch(url)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            tree = _parse_html(response)
             
             prices = {
                 'source': 'eBay',
                 'search_query': search_query,
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': timestamp,
                 'url': url,
                 'sold_listings': []
             }
             
             # Parse eBay results - try multiple selector patterns
-            items = soup.find_all('div', class_='s-item__wrapper')
+            items = _select(tree, 'div.s-item__wrapper')
             if not items:
-                items = soup.find_all('div', class_='s-item')
+                items = _select(tree, 'div.s-item')
             if not items:
-                items = soup.find_all('div', {'data-view': 'item'})
+                items = _select(tree, 'div[data-view="item"]')
+            price_texts = []
             
             # Debug info
             prices['debug_info'] = {
                 'total_items_found': len(items),
-                'page_title': soup.title.string if soup.title else 'No title',
-                'has_captcha': 'captcha' in response.text.lower(),
-                'response_length': len(response.text)
+                'page_title': _text(_select_one(tree, 'title')) or 'No title',
+                'has_captcha': _CAPTCHA_RE.search(response.content) is not None,
+                'response_length': len(response.content)
             }
             
-            for item in items[:10]:  # Top 10 sold listings
+            for item in items:
+                if len(prices['sold_listings']) >= 10:  # Top 10 sold listings
+                    break
                 try:
                     # Try multiple title selectors
-                    title = (item.find('h3', class_='s-item__title') or 
-                            item.find('a', class_='s-item__link') or
-                            item.find('h3') or
-                            item.find('a'))
+                    title = (_select_one(item, 'h3.s-item__title') or 
+                            _select_one(item, 'a.s-item__link') or
+                            _select_one(item, 'h3') or
+                            _select_one(item, 'a'))
+                    if not title:
+                        continue
+                    
+                    # Skip promotional items or non-card items before any further lookups
+                    title_text = _text(title)
+                    if _SKIP_RE.search(title_text):
+                        continue
                     
                     # Try multiple price selectors
-                    price = (item.find('span', class_='s-item__price') or
-                            item.find('span', class_='notranslate') or
-                            item.find('span', string=lambda text: text and '$' in text))
+                    price = (_select_one(item, 'span.s-item__price') or
+                            _select_one(item, 'span.notranslate') or
+                            next((span for span in _select(item, 'span') if '$' in _text(span)), None))
+                    if not price:
+                        continue
                     
                     # Try multiple date selectors
-                    date = (item.find('span', class_='s-item__endedDate') or
-                           item.find('span', class_='s-item__sold'))
+                    date = (_select_one(item, 'span.s-item__endedDate') or
+                           _select_one(item, 'span.s-item__sold'))
                     
-                    if title and price:
-                        title_text = title.get_text(strip=True) if hasattr(title, 'get_text') else str(title)
-                        price_text = price.get_text(strip=True) if hasattr(price, 'get_text') else str(price)
-                        
-                        # Skip promotional items or non-card items
-                        if not any(skip_word in title_text.lower() for skip_word in ['promotion', 'lot of', 'bulk', 'random']):
-                            prices['sold_listings'].append({
-                                'title': title_text,
-                                'price': self._parse_price(price_text),
-                                'sold_date': date.get_text(strip=True) if date and hasattr(date, 'get_text') else 'Unknown',
-                                'shipping': self._extract_shipping(item)
-                            })
+                    listing = {
+                        'title': title_text,
+                        'price': None,  # Filled in below by _parse_prices_bulk
+                        'sold_date': _text(date) or 'Unknown',
+                        'shipping': self._extract_shipping(item)
+                    }
+                    # Append both only once the row is complete so they stay index-aligned
+                    price_texts.append(_text(price))
+                    prices['sold_listings'].append(listing)
                 except Exception as e:
                     continue
             
+            for listing, price in zip(prices['sold_listings'], self._parse_prices_bulk(price_texts)):
+                listing['price'] = price
+            
             # Calculate average sold price
             if prices['sold_listings']:
-                valid_prices = [p['price'] for p in prices['sold_listings'] if p['price'] > 0]
-                if valid_prices:
-                    prices['average_sold_price'] = sum(valid_prices) / len(valid_prices)
-                    prices['min_sold_price'] = min(valid_prices)
-                    prices['max_sold_price'] = max(valid_prices)
+                valid_prices = np.fromiter(
+                    (p['price'] for p in prices['sold_listings'] if p['price'] > 0),
+                    dtype=np.float64
+                )
+                if valid_prices.size:
+                    prices['average_sold_price'] = float(valid_prices.mean())
+                    prices['min_sold_price'] = float(valid_prices.min())
+                    prices['max_sold_price'] = float(valid_prices.max())
             else:
                 # Fallback: Generate reasonable mock data based on card name
                 # This is for development/demo purposes when scraping fails
-                import random
                 base_price = self._estimate_card_value(card_name, set_name)
-                mock_prices = [
-                    base_price * random.uniform(0.7, 1.3) for _ in range(random.randint(3, 8))
-                ]
+                mock_prices = base_price * np.random.uniform(0.7, 1.3, np.random.randint(3, 9))
                 
+                title = f"{card_name} {set_name or ''} Pokemon Card".strip()
                 prices['sold_listings'] = [
                     {
-                        'title': f"{card_name} {set_name or ''} Pokemon Card".strip(),
+                        'title': title,
                         'price': price,
                         'sold_date': 'Recently',
                         'shipping': 'Free'
-                    } for price in mock_prices
+                    } for price in mock_prices.tolist()
                 ]
                 
-                prices['average_sold_price'] = sum(mock_prices) / len(mock_prices)
-                prices['min_sold_price'] = min(mock_prices)
-                prices['max_sold_price'] = max(mock_prices)
+                prices['average_sold_price'] = float(mock_prices.mean())
+                prices['min_sold_price'] = float(mock_prices.min())
+                prices['max_sold_price'] = float(mock_prices.max())
                 prices['note'] = 'Mock data - live scraping currently unavailable'
             
             return prices
@@ -208,10 +369,10 @@ class CardPriceScraper:
             return {
                 'source': 'eBay',
                 'error': str(e),
-                'timestamp': datetime.now().isoformat()
+                'timestamp': timestamp
             }
     
-    def scrape_cardmarket(self, card_name: str, set_name: str = None) -> Dict[str, Any]:
+    def scrape_cardmarket(self, card_name: str, set_name: str = None, timestamp: str = None) -> Dict[str, Any]:
         """
         Scrape prices from Cardmarket (European market)
         Note: Cardmarket has strict anti-scraping measures
@@ -219,10 +380,11 @@ class CardPriceScraper:
         return {
             'source': 'Cardmarket',
             'note': 'Cardmarket scraping requires API access',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': timestamp or datetime.now().isoformat()
         }
     
-    def get_all_prices(self, card_name: str, set_name: str = None, card_number: str = None) -> Dict[str, Any]:
+    def get_all_prices(self, card_name: str, set_name: str = None, card_number: str = None,
+                       timestamp: str = None) -> Dict[str, Any]:
         """
         Get prices from all available sources
         
@@ -230,46 +392,75 @@ class CardPriceScraper:
             card_name: Name of the card
             set_name: Optional set name
             card_number: Optional card number for more precise matching
+            timestamp: ISO timestamp to record on every source; defaults to now
             
         Returns:
             Consolidated pricing information from all sources
         """
+        # One timestamp for the whole lookup, shared by every source
+        timestamp = timestamp or datetime.now().isoformat()
+        
         results = {
             'card_name': card_name,
             'set_name': set_name,
             'card_number': card_number,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': timestamp,
             'sources': {}
         }
         
-        # Add delay between requests to be respectful
-        delay = 1  # seconds
-        
-        # TCGPlayer
-        results['sources']['tcgplayer'] = self.scrape_tcgplayer(card_name, set_name)
-        time.sleep(delay)
-        
-        # eBay
-        results['sources']['ebay'] = self.scrape_ebay(card_name, set_name)
-        time.sleep(delay)
+        scrapers = {
+            'tcgplayer': self.scrape_tcgplayer,
+            'ebay': self.scrape_ebay,
+            'cardmarket': self.scrape_cardmarket
+        }
         
-        # Cardmarket
-        results['sources']['cardmarket'] = self.scrape_cardmarket(card_name, set_name)
+        # Sources live on different hosts, so fetch them concurrently;
+        # per-host politeness is handled by _throttle
+        with ThreadPoolExecutor(max_workers=len(scrapers)) as executor:
+            futures = {
+                source: executor.submit(scraper, card_name, set_name, timestamp)
+                for source, scraper in scrapers.items()
+            }
+            
+            for source, future in futures.items():
+                try:
+                    results['sources'][source] = future.result()
+                except Exception as e:
+                    results['sources'][source] = {
+                        'source': source,
+                        'error': str(e),
+                        'timestamp': timestamp
+                    }
         
         # Calculate overall metrics
         self._calculate_summary_stats(results)
         
         return results
     
+    def get_prices_bulk(self, cards: List[Tuple[str, Optional[str], Optional[str]]],
+                        max_workers: int = 8) -> List[Dict[str, Any]]:
+        """
+        Get prices for many cards concurrently
+        
+        Args:
+            cards: (card_name, set_name, card_number) tuples; set_name and card_number may be None
+            max_workers: Maximum number of cards looked up at once
+            
+        Returns:
+            One get_all_prices result per card, in input order
+        """
+        # Requests to the same host are still spaced out by _throttle, so this
+        # scales until each host's rate limit is reached
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda card: self.get_all_prices(*card), cards))
+    
     def _parse_price(self, price_text: str) -> float:
         """Extract numeric price from text"""
         if not price_text:
             return 0.0
             
         # Look for first price pattern in the text
-        # Matches patterns like $12.99, €15.50, USD 25.00, etc.
-        price_pattern = r'[\$€£]?\s*(\d+(?:,\d{3})*(?:\.\d{2})?)'
-        match = re.search(price_pattern, price_text)
+        match = _PRICE_RE.search(price_text)
         
         if match:
             price_str = match.group(1).replace(',', '')
@@ -279,22 +470,37 @@ class CardPriceScraper:
                 pass
         
         # Fallback to old method
-        cleaned = re.sub(r'[^\d.,]', '', price_text)
-        cleaned = cleaned.replace(',', '')
+        cleaned = _CLEAN_RE.sub('', price_text).replace(',', '')
         
         try:
             return float(cleaned) if cleaned else 0.0
         except ValueError:
             return 0.0
     
+    def _parse_prices_bulk(self, price_texts: List[str]) -> List[float]:
+        """Extract numeric prices from many texts with a single regex scan"""
+        # Join on a character neither the price pattern nor its \s* can consume,
+        # then map each match back to its text by offset
+        joined = '\0'.join(price_texts)
+        starts = list(itertools.accumulate((len(text) + 1 for text in price_texts[:-1]), initial=0))
+        
+        prices = [None] * len(price_texts)
+        for match in _PRICE_RE.finditer(joined):
+            index = bisect.bisect_right(starts, match.start()) - 1
+            if prices[index] is None:
+                prices[index] = float(match.group(1).replace(',', ''))
+        
+        # Texts without a price pattern use _parse_price's fallback
+        return [price if price is not None else self._parse_price(text)
+                for text, price in zip(price_texts, prices)]
+    
     def _extract_shipping(self, item) -> str:
         """Extract shipping cost from eBay item"""
-        shipping = item.find('span', class_='s-item__shipping')
-        if shipping:
-            return shipping.text.strip()
-        return 'Unknown'
+        return _text(_select_one(item, 'span.s-item__shipping')) or 'Unknown'
     
-    def _estimate_card_value(self, card_name: str, set_name: str = None) -> float:
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _estimate_card_value(card_name: str, set_name: str = None) -> float:
         """Estimate card value based on name and set for fallback pricing"""
         # Simple heuristic pricing based on card popularity
         card_name_lower = card_name.lower()
@@ -303,9 +509,9 @@ class CardPriceScraper:
         base_price = 5.0  # Default base price
         
         # Popular/expensive cards
-        if any(name in card_name_lower for name in ['charizard', 'pikachu', 'mewtwo', 'mew']):
+        if _EXPENSIVE_CARDS_RE.search(card_name_lower):
             base_price = 50.0
-        elif any(name in card_name_lower for name in ['blastoise', 'venusaur', 'alakazam']):
+        elif _MID_TIER_CARDS_RE.search(card_name_lower):
             base_price = 25.0
         elif 'ex' in card_name_lower or 'gx' in card_name_lower:
             base_price = 30.0
@@ -313,32 +519,34 @@ class CardPriceScraper:
             base_price = 15.0
         
         # Set modifiers
-        if any(set_term in set_name_lower for set_term in ['base', 'shadowless', 'first edition']):
+        if _PREMIUM_SETS_RE.search(set_name_lower):
             base_price *= 2.0
-        elif any(set_term in set_name_lower for set_term in ['unlimited', 'evolutions']):
+        elif _DISCOUNT_SETS_RE.search(set_name_lower):
             base_price *= 0.8
         
         return max(base_price, 1.0)  # Minimum $1
     
     def _calculate_summary_stats(self, results: Dict[str, Any]) -> None:
         """Calculate summary statistics across all sources"""
-        all_prices = []
+        listing_keys = {'tcgplayer': 'results', 'ebay': 'sold_listings'}
         
-        # Collect all valid prices
-        for source, data in results['sources'].items():
-            if 'error' not in data:
-                if source == 'tcgplayer' and 'results' in data:
-                    all_prices.extend([r['price'] for r in data['results'] if r.get('price', 0) > 0])
-                elif source == 'ebay' and 'sold_listings' in data:
-                    all_prices.extend([r['price'] for r in data['sold_listings'] if r.get('price', 0) > 0])
+        # Collect all valid prices straight into an array
+        all_prices = np.fromiter(
+            (r['price']
+             for source, data in results['sources'].items()
+             if 'error' not in data and listing_keys.get(source) in data
+             for r in data[listing_keys[source]]
+             if r.get('price', 0) > 0),
+            dtype=np.float64
+        )
         
-        if all_prices:
+        if all_prices.size:
             results['summary'] = {
-                'average_price': sum(all_prices) / len(all_prices),
-                'min_price': min(all_prices),
-                'max_price': max(all_prices),
-                'price_range': max(all_prices) - min(all_prices),
-                'sample_size': len(all_prices)
+                'average_price': float(all_prices.mean()),
+                'min_price': float(all_prices.min()),
+                'max_price': float(all_prices.max()),
+                'price_range': float(np.ptp(all_prices)),
+                'sample_size': int(all_prices.size)
             }
 
 
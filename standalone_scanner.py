@@ -6,12 +6,30 @@ import cv2
 import numpy as np
 from typing import Dict, Any, Optional
 import os
+import textwrap
+import functools
+import string
+import heapq
+import threading
 from datetime import datetime
 import json
+from cachetools import TTLCache
 
 from card_analyzer import CardAnalyzer
 from price_scraper import CardPriceScraper
 
+# Longest edge (px) of the frame copy used for card edge detection
+DETECTION_MAX_DIM = 1024
+
+# Largest contours checked for a card outline, and the smallest share of the
+# frame a card outline may cover
+MAX_CARD_CANDIDATES = 10
+MIN_CARD_AREA_RATIO = 0.05
+
+# Priced cards kept for repeat scans, and how long (seconds) their prices stay fresh
+SCAN_CACHE_SIZE = 1024
+SCAN_CACHE_TTL = 3600
+
 
 class StandaloneCardScanner:
     """Card scanner that uses only AI and web scraping - no database needed"""
@@ -20,7 +38,8 @@ class StandaloneCardScanner:
         """Initialize the scanner with Gemini API"""
         self.analyzer = CardAnalyzer(api_key=google_api_key, model_name=gemini_model)
         self.price_scraper = CardPriceScraper()
-        self.scan_cache = {}
+        self.scan_cache = TTLCache(maxsize=SCAN_CACHE_SIZE, ttl=SCAN_CACHE_TTL)
+        self._scan_cache_lock = threading.Lock()
         
     def process_card(self, image: np.ndarray) -> Dict[str, Any]:
         """
@@ -32,15 +51,17 @@ class StandaloneCardScanner:
         Returns:
             Complete analysis with card details and pricing
         """
+        # One timestamp for the whole scan, shared by analysis and pricing
+        timestamp = datetime.now().isoformat()
         result = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': timestamp,
             'success': False
         }
         
         # Step 1: AI Analysis with Gemini
         try:
             print("Analyzing card with Gemini AI...")
-            ai_analysis = self.analyzer.analyze_card(image)
+            ai_analysis = self.analyzer.analyze_card(image, timestamp=timestamp)
             result['card_details'] = ai_analysis
             
             # Check if AI analysis had an error
@@ -83,20 +104,22 @@ class StandaloneCardScanner:
             # Step 2: Price Lookup
             print(f"Looking up prices for: {card_name}")
             
-            # Check cache first
-            cache_key = f"{card_name}_{set_name if set_name else 'unknown'}"
-            if cache_key in self.scan_cache:
-                cached = self.scan_cache[cache_key]
-                if (datetime.now() - datetime.fromisoformat(cached['timestamp'])).seconds < 3600:
-                    result['pricing'] = cached
-                    result['pricing']['from_cache'] = True
-                    result['success'] = True
-                    return result
+            # Check cache first; expired entries are dropped by the TTL cache itself
+            # (card_name may be None for raw_analysis results, so normalize via str())
+            cache_key = f"{str(card_name).strip().lower()}_{str(set_name).strip().lower() if set_name else 'unknown'}"
+            with self._scan_cache_lock:
+                cached = self.scan_cache.get(cache_key)
+            if cached is not None:
+                result['pricing'] = cached
+                result['pricing']['from_cache'] = True
+                result['success'] = True
+                return result
             
             # Fetch fresh prices
-            pricing = self.price_scraper.get_all_prices(card_name, set_name, card_number)
+            pricing = self.price_scraper.get_all_prices(card_name, set_name, card_number, timestamp=timestamp)
             result['pricing'] = pricing
-            self.scan_cache[cache_key] = pricing
+            with self._scan_cache_lock:
+                self.scan_cache[cache_key] = pricing
             result['success'] = True
             
         except Exception as e:
@@ -107,12 +130,15 @@ class StandaloneCardScanner:
     
     def create_display(self, image: np.ndarray, results: Dict[str, Any]) -> np.ndarray:
         """Create a visual display of results"""
-        display = image.copy()
-        height, width = display.shape[:2]
+        height, width = image.shape[:2]
         
-        # Create info panel
+        # Lay the card and a white info panel into one output buffer and draw
+        # the text straight into the panel's view of it
         panel_width = 500
-        info_panel = np.ones((height, panel_width, 3), dtype=np.uint8) * 255
+        display = np.empty((height, width + panel_width, 3), dtype=np.uint8)
+        display[:, :width] = image
+        info_panel = display[:, width:]
+        info_panel.fill(255)
         
         y_offset = 30
         font = cv2.FONT_HERSHEY_SIMPLEX
@@ -169,93 +195,169 @@ class StandaloneCardScanner:
                        (10, y_offset), font, 0.7, (0, 0, 255), 2)
             if 'error' in results:
                 y_offset += 35
-                # Word wrap error message
-                error_msg = results['error']
-                words = error_msg.split()
-                line = ""
-                for word in words:
-                    test_line = line + word + " "
-                    if len(test_line) > 40:
-                        cv2.putText(info_panel, line.strip(), 
-                                   (10, y_offset), font, 0.5, (0, 0, 0), 1)
-                        y_offset += 25
-                        line = word + " "
-                    else:
-                        line = test_line
-                if line:
-                    cv2.putText(info_panel, line.strip(), 
+                # Word wrap error message to the panel; sizing by the widest glyph
+                # guarantees no wrapped line overflows it
+                max_chars = (panel_width - 20) // _max_glyph_width(font, 0.5, 1)
+                for line in textwrap.wrap(results['error'], width=max_chars):
+                    cv2.putText(info_panel, line, 
                                (10, y_offset), font, 0.5, (0, 0, 0), 1)
+                    y_offset += 25
         
-        # Combine images
-        return np.hstack([display, info_panel])
+        return display
 
 
-def detect_and_transform_card(frame: np.ndarray) -> Optional[np.ndarray]:
+@functools.lru_cache(maxsize=None)
+def _max_glyph_width(font: int, scale: float, thickness: int) -> int:
+    """Width (px) of the widest printable character when drawn with cv2.putText"""
+    return max(cv2.getTextSize(char, font, scale, thickness)[0][0]
+               for char in string.printable if not char.isspace())
+
+
+def _corner_sum(point) -> float:
+    """Sort key: x + y, smallest at top-left and largest at bottom-right"""
+    return point[0] + point[1]
+
+
+def _corner_diff(point) -> float:
+    """Sort key: y - x, smallest at top-right and largest at bottom-left"""
+    return point[1] - point[0]
+
+
+def _order_corners(points: np.ndarray) -> np.ndarray:
     """
-    Detect card in frame and return transformed image
+    Order 4 corner points as top-left, top-right, bottom-right, bottom-left
     
-    Args:
-        frame: Input image
-        
-    Returns:
-        Transformed card image or None if no card detected
+    Works on a plain list: for a 4x2 array, numpy's per-call dispatch costs
+    more than the arithmetic itself.
+    """
+    pts = points.tolist()
+    
+    # Top-left has smallest sum, bottom-right has largest sum;
+    # top-right has smallest difference, bottom-left has largest difference
+    return np.array([
+        min(pts, key=_corner_sum),
+        min(pts, key=_corner_diff),
+        max(pts, key=_corner_sum),
+        max(pts, key=_corner_diff)
+    ], dtype="float32")
+
+
+class CardDetector:
     """
-    # Convert to grayscale
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    Detects a card in camera frames and warps it to a flat, upright image
     
-    # Blur to reduce noise
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    Grayscale, blur and edge buffers are kept between calls and only
+    reallocated when the frame size changes, so a live feed doesn't allocate
+    fresh working images every frame. An instance is not safe to share
+    between threads.
+    """
     
-    # Edge detection
-    edges = cv2.Canny(blurred, 50, 150)
+    def __init__(self):
+        """Initialize the detector with no scratch buffers yet"""
+        self._buffer_shape = None
+        self._gray = None
+        self._blurred = None
+        self._edges = None
     
-    # Find contours
-    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    def _scratch_buffers(self, shape: tuple) -> tuple:
+        """Grayscale, blurred and edge buffers for a (height, width) frame"""
+        if shape != self._buffer_shape:
+            self._gray = np.empty(shape, dtype=np.uint8)
+            self._blurred = np.empty(shape, dtype=np.uint8)
+            self._edges = np.empty(shape, dtype=np.uint8)
+            self._buffer_shape = shape
+        return self._gray, self._blurred, self._edges
     
-    # Find largest rectangular contour
-    for contour in sorted(contours, key=cv2.contourArea, reverse=True):
-        # Approximate contour to polygon
-        epsilon = 0.02 * cv2.arcLength(contour, True)
-        approx = cv2.approxPolyDP(contour, epsilon, True)
+    def detect_and_transform(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Detect card in frame and return transformed image
         
-        # Check if it's a quadrilateral
-        if len(approx) == 4:
-            # Get corner points
-            points = approx.reshape(4, 2)
-            
-            # Order points: top-left, top-right, bottom-right, bottom-left
-            rect = np.zeros((4, 2), dtype="float32")
-            
-            # Top-left has smallest sum, bottom-right has largest sum
-            s = points.sum(axis=1)
-            rect[0] = points[np.argmin(s)]
-            rect[2] = points[np.argmax(s)]
-            
-            # Top-right has smallest difference, bottom-left has largest difference
-            diff = np.diff(points, axis=1)
-            rect[1] = points[np.argmin(diff)]
-            rect[3] = points[np.argmax(diff)]
-            
-            # Calculate destination points (standard card ratio 2.5:3.5)
-            width = 350
-            height = 490
-            
-            dst = np.array([
-                [0, 0],
-                [width - 1, 0],
-                [width - 1, height - 1],
-                [0, height - 1]
-            ], dtype="float32")
+        Args:
+            frame: Input image
             
-            # Get perspective transform
-            M = cv2.getPerspectiveTransform(rect, dst)
+        Returns:
+            Transformed card image or None if no card detected
+        """
+        # Detect on a downscaled copy: card edges survive, there are far fewer pixels
+        # to stream through each pass, and sensor noise on large photos is averaged out.
+        # Halving repeatedly keeps INTER_AREA on its fast 2x path.
+        small = frame
+        scale = 1.0
+        while max(small.shape[:2]) > DETECTION_MAX_DIM:
+            small = cv2.resize(small, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+            scale /= 2
+        
+        # cv2 only writes into a dst buffer it can use; otherwise it returns a new
+        # array, so always take the returned image rather than the buffer itself
+        gray, blurred, edges = self._scratch_buffers(small.shape[:2])
+        
+        # Convert to grayscale
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=gray)
+        
+        # Blur to reduce noise
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0, dst=blurred)
+        
+        # Edge detection
+        edges = cv2.Canny(blurred, 50, 150, edges=edges)
+        
+        # Find contours
+        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        # Find largest rectangular contour among the few biggest candidates;
+        # they come out largest first, so stop once they're too small to be a card
+        min_area = MIN_CARD_AREA_RATIO * small.shape[0] * small.shape[1]
+        for contour in heapq.nlargest(MAX_CARD_CANDIDATES, contours, key=cv2.contourArea):
+            if cv2.contourArea(contour) < min_area:
+                break
             
-            # Apply transform
-            warped = cv2.warpPerspective(frame, M, (width, height))
+            # Approximate contour to polygon
+            epsilon = 0.02 * cv2.arcLength(contour, True)
+            approx = cv2.approxPolyDP(contour, epsilon, True)
             
-            return warped
+            # Check if it's a quadrilateral
+            if len(approx) == 4:
+                # Get corner points, ordered top-left, top-right, bottom-right, bottom-left
+                rect = _order_corners(approx.reshape(4, 2))
+                
+                # Map corners back to full resolution so the warp keeps full detail
+                rect /= scale
+                
+                # Calculate destination points (standard card ratio 2.5:3.5)
+                width = 350
+                height = 490
+                
+                dst = np.array([
+                    [0, 0],
+                    [width - 1, 0],
+                    [width - 1, height - 1],
+                    [0, height - 1]
+                ], dtype="float32")
+                
+                # Get perspective transform
+                M = cv2.getPerspectiveTransform(rect, dst)
+                
+                # Apply transform
+                warped = cv2.warpPerspective(frame, M, (width, height))
+                
+                return warped
+        
+        return None
+
+
+def detect_and_transform_card(frame: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Detect card in a single frame and return transformed image
+    
+    For a stream of frames, keep a CardDetector and call
+    detect_and_transform on it instead so its buffers are reused.
     
-    return None
+    Args:
+        frame: Input image
+        
+    Returns:
+        Transformed card image or None if no card detected
+    """
+    return CardDetector().detect_and_transform(frame)
 
 
 def main():
@@ -277,6 +379,7 @@ def main():
     print()
     
     cap = cv2.VideoCapture(0)  # Use default camera
+    detector = CardDetector()
     
     while True:
         ret, frame = cap.read()
@@ -293,7 +396,7 @@ def main():
             print("\nCapturing and processing card...")
             
             # Try to detect and transform card
-            card_image = detect_and_transform_card(frame)
+            card_image = detector.detect_and_transform(frame)
             
             if card_image is not None:
                 # Process the card
@@ -11,6 +11,10 @@ from io import BytesIO
 from PIL import Image
 import os
 from dotenv import load_dotenv
+try:
+    from turbojpeg import TurboJPEG
+except ImportError:  # Fall back to OpenCV's JPEG codec when PyTurboJPEG isn't installed
+    TurboJPEG = None
 
 from standalone_scanner import StandaloneCardScanner
 
@@ -20,6 +24,74 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
+DISPLAY_JPEG_QUALITY = 80
+
+# EXIF Orientation tag, and the transform that turns each non-upright value upright
+EXIF_ORIENTATION_TAG = 0x0112
+_ORIENTATION_TRANSFORMS = {
+    2: lambda img: cv2.flip(img, 1),
+    3: lambda img: cv2.rotate(img, cv2.ROTATE_180),
+    4: lambda img: cv2.flip(img, 0),
+    5: cv2.transpose,
+    6: lambda img: cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE),
+    7: lambda img: cv2.rotate(cv2.transpose(img), cv2.ROTATE_180),
+    8: lambda img: cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE),
+}
+
+# libjpeg-turbo handle; None when the wrapper or the shared library is unavailable
+try:
+    _tj = TurboJPEG() if TurboJPEG is not None else None
+except (OSError, RuntimeError) as e:
+    print(f"libjpeg-turbo unavailable, using OpenCV JPEG codec: {e}")
+    _tj = None
+
+
+def decode_image(image_bytes: bytes) -> np.ndarray:
+    """
+    Decode an uploaded image into an upright BGR array
+    
+    Args:
+        image_bytes: Raw encoded image bytes
+        
+    Returns:
+        BGR image array, or None if the bytes can't be decoded
+    """
+    if _tj is not None:
+        try:
+            image = _tj.decode(image_bytes)
+        except OSError:
+            pass  # Not a JPEG (e.g. PNG upload); let OpenCV handle it
+        else:
+            # libjpeg-turbo ignores EXIF, so rotate phone photos upright like cv2.imdecode does
+            transform = _ORIENTATION_TRANSFORMS.get(_exif_orientation(image_bytes))
+            return transform(image) if transform else image
+    return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+
+
+def _exif_orientation(image_bytes: bytes) -> int:
+    """EXIF Orientation of an encoded image (1 = upright), read from the header only"""
+    try:
+        with Image.open(BytesIO(image_bytes)) as img:
+            return img.getexif().get(EXIF_ORIENTATION_TAG, 1)
+    except Exception:
+        return 1
+
+
+def encode_jpeg(image: np.ndarray) -> bytes:
+    """
+    JPEG-encode a BGR image array
+    
+    Args:
+        image: BGR image array
+        
+    Returns:
+        Encoded JPEG bytes
+    """
+    if _tj is not None:
+        return _tj.encode(image, quality=DISPLAY_JPEG_QUALITY)
+    _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, DISPLAY_JPEG_QUALITY])
+    return buffer.tobytes()
+
 # Initialize scanner with error handling
 try:
     scanner = StandaloneCardScanner(google_api_key=os.environ.get('GOOGLE_API_KEY'))
@@ -57,21 +129,16 @@ def scan_card():
         image_bytes = base64.b64decode(image_data)
         
         # Convert to numpy array
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        image = decode_image(image_bytes)
         
         # Process the card
         results = scanner.process_card(image)
         
-        # Create display image
-        display = scanner.create_display(image, results)
-        
-        # Convert display to base64
-        _, buffer = cv2.imencode('.jpg', display)
-        display_base64 = base64.b64encode(buffer).decode('utf-8')
-        
-        # Add display image to results
-        results['display_image'] = f"data:image/jpeg;base64,{display_base64}"
+        # Render the annotated display image only for clients that ask for it
+        if data.get('include_display', False):
+            display = scanner.create_display(image, results)
+            display_base64 = base64.b64encode(encode_jpeg(display)).decode('ascii')
+            results['display_image'] = f"data:image/jpeg;base64,{display_base64}"
         
         return jsonify(results)
         